@@ -1,7 +1,12 @@
 import os
+import queue
+import threading
+from io import BytesIO
+from collections import OrderedDict
+from concurrent.futures import Future
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-from typing import Optional
+from typing import Callable, Dict, Optional
 from PIL import Image, ImageTk
 
 from utils import (
@@ -20,7 +25,7 @@ from utils import (
     resize_for_preview,
     SUPPORTED_IMAGE_FORMATS
 )
-from transforms import apply_transforms, get_palette_info
+from transforms import apply_transforms, get_palette_info, limit_numba_threads
 
 
 COLOR_LIGHT_BLUE = TRANS_LIGHT_BLUE_HEX    # #5bcefa
@@ -31,6 +36,62 @@ COLOR_BUTTON_BG = COLOR_LIGHT_PINK
 COLOR_BUTTON_FG = "#333333"
 COLOR_FRAME_BG = COLOR_WHITE
 
+SAVE_FILETYPES = {
+    'png': ("PNG files", "*.png"),
+    'webp': ("WebP files (lossless)", "*.webp"),
+    'jxl': ("JPEG XL files (lossless)", "*.jxl"),
+    'bmp': ("BMP files", "*.bmp")
+}
+
+
+class _BackgroundWorker:
+    """one daemon thread that runs submitted jobs in order"""
+    
+    def __init__(self, initializer: Optional[Callable[[], None]] = None):
+        self._jobs: queue.Queue = queue.Queue()
+        self._initializer = initializer
+        # daemon rather than a ThreadPoolExecutor worker so closing the window never
+        # waits on a transform still running - its result would be thrown away anyway,
+        # and the no-numba fallbacks can take minutes on a big image
+        self._thread = threading.Thread(target=self._run, name="trans-writes-worker", daemon=True)
+        self._thread.start()
+    
+    def submit(self, function, *args, **kwargs) -> Future:
+        """queue a job and return a future for its result"""
+        future = Future()
+        self._jobs.put((future, function, args, kwargs))
+        return future
+    
+    def shutdown(self) -> None:
+        """cancel queued jobs and let the thread exit after the current one"""
+        while True:
+            try:
+                job = self._jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None:
+                job[0].cancel()
+        self._jobs.put(None)
+    
+    def _run(self) -> None:
+        if self._initializer is not None:
+            self._initializer()
+        
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            
+            future, function, args, kwargs = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = function(*args, **kwargs)
+            except BaseException as error:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
 
 class TransWritesApp:
     """main app class... handles the UI and image transformations"""
@@ -45,8 +106,40 @@ class TransWritesApp:
         self.original_image: Optional[Image.Image] = None
         self.original_file_size: int = 0
         self.transformed_image: Optional[Image.Image] = None
+        # downsampled copy of the original for quick draft previews
+        self._preview_source: Optional[Image.Image] = None
         self.preview_photo: Optional[ImageTk.PhotoImage] = None
         self._estimated_size_by_format: dict[str, int] = {}
+        self._size_estimators = {
+            'PNG': estimate_png_size,
+            'WebP': estimate_webp_size,
+            'JXL': estimate_jxl_size,
+            'BMP': estimate_bmp_size,
+        }
+        # encode scratch space reused across estimates, one per thread
+        self._size_buffer = BytesIO()
+        self._worker_size_buffer = BytesIO()
+        self._filetypes_by_format = self._build_save_filetypes()
+        self._pending_job: Optional[str] = None
+        # (image id, zoom) -> (resized image, photo), oldest first; also capped by
+        # total pixels since a zoomed-in preview of a big photo is hundreds of MB
+        self._preview_cache: OrderedDict = OrderedDict()
+        self._preview_cache_size = 8
+        self._preview_cache_pixels = 0
+        self._preview_cache_max_pixels = 16_000_000
+        # heavy work runs off the Tk thread; results older than _job_gen are dropped
+        self._executor = _BackgroundWorker(initializer=limit_numba_threads)
+        self._job_gen = 0
+        self._load_gen = 0
+        # (image id, dithering, pixelation, invert) -> (transformed image, size estimates)
+        self._transform_cache: OrderedDict = OrderedDict()
+        self._transform_cache_size = 4
+        # key of the last transform shown or in flight
+        self._last_params: Optional[tuple] = None
+        # full-res and draft jobs for _last_params; cancelled once superseded so
+        # the worker doesn't grind through results nobody will see
+        self._transform_future: Optional[Future] = None
+        self._draft_future: Optional[Future] = None
 
         self.dithering_method = tk.StringVar(value='none')
         self.pixelation_size = tk.IntVar(value=1)
@@ -92,19 +185,32 @@ class TransWritesApp:
     
     def _create_flag_banner(self) -> None:
         """trans flag banner: blue-pink-white-pink-blue"""
-        banner_frame = tk.Frame(self.main_frame, height=10)
-        banner_frame.pack(fill=tk.X)
-        banner_frame.pack_propagate(False)
+        self.banner_canvas = tk.Canvas(self.main_frame, height=10, highlightthickness=0)
+        self.banner_canvas.pack(fill=tk.X)
+        self.banner_canvas.bind('<Configure>', self._draw_flag_banner)
+    
+    def _draw_flag_banner(self, event) -> None:
+        """redraw the banner stripes to fill the new width"""
+        self.banner_canvas.delete("all")
         
-        for stripe_color in (
+        stripe_colors = (
             COLOR_LIGHT_BLUE,
             COLOR_LIGHT_PINK,
             COLOR_WHITE,
             COLOR_LIGHT_PINK,
             COLOR_LIGHT_BLUE,
-        ):
-            stripe = tk.Frame(banner_frame, bg=stripe_color, height=10)
-            stripe.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        )
+        stripe_width = event.width / len(stripe_colors)
+        
+        for i, stripe_color in enumerate(stripe_colors):
+            self.banner_canvas.create_rectangle(
+                round(i * stripe_width),
+                0,
+                round((i + 1) * stripe_width),
+                event.height,
+                fill=stripe_color,
+                width=0
+            )
     
     def _create_title_area(self) -> None:
         """title area with app name"""
@@ -216,18 +322,26 @@ class TransWritesApp:
         swatch_frame = ttk.Frame(section_frame, style='Trans.TFrame')
         swatch_frame.pack(fill=tk.X, pady=5)
         
-        for color in TRANS_PALETTE:
+        # one canvas for the whole row instead of a frame per color
+        swatch_canvas = tk.Canvas(
+            swatch_frame,
+            width=22 * len(TRANS_PALETTE),
+            height=22,
+            bg=COLOR_FRAME_BG,
+            highlightthickness=0
+        )
+        swatch_canvas.pack(side=tk.LEFT)
+        
+        for i, color in enumerate(TRANS_PALETTE):
             hex_color = "#{:02x}{:02x}{:02x}".format(*color)
-            swatch = tk.Frame(
-                swatch_frame, 
-                bg=hex_color, 
-                width=20, 
-                height=20,
-                highlightthickness=1,
-                highlightbackground='#cccccc'
+            swatch_canvas.create_rectangle(
+                i * 22 + 1,
+                1,
+                i * 22 + 21,
+                21,
+                fill=hex_color,
+                outline='#cccccc'
             )
-            swatch.pack(side=tk.LEFT, padx=1)
-            swatch.pack_propagate(False)
     
     def _create_dithering_section(self, parent: ttk.Frame) -> None:
         """dithering options"""
@@ -417,12 +531,22 @@ class TransWritesApp:
         canvas_frame.grid_rowconfigure(0, weight=1)
         canvas_frame.grid_columnconfigure(0, weight=1)
         
+        # zoom is 1.1 ** step; an integer step retraces exactly, a float product drifts
+        self._zoom_step = 0
         self.zoom_level = 1.0
+        self._zoom_job: Optional[str] = None
+        self._resize_job: Optional[str] = None
+        # fit-to-canvas bounds for the 1x preview, follows the canvas size
+        self._preview_max_size = (600, 450)
+        self._img_item: Optional[int] = None
+        # (image id, zoom) currently on the canvas
+        self._last_drawn: Optional[tuple] = None
 
         self.preview_canvas.bind('<MouseWheel>', self._on_mouse_wheel)
         self.preview_canvas.bind('<Button-4>', self._on_mouse_wheel)
         self.preview_canvas.bind('<Button-5>', self._on_mouse_wheel)
         self.preview_canvas.bind('<Double-Button-1>', self._on_zoom_reset)
+        self.preview_canvas.bind('<Configure>', self._on_canvas_resize)
     
     def _create_info_panel(self) -> None:
         """file size info panel at the bottom"""
@@ -522,25 +646,47 @@ class TransWritesApp:
         if not file_path:
             return
         
-        try:
-            self.original_image = Image.open(file_path)
-            self.original_image.load()
-            self.original_file_size = get_file_size(file_path)
-            
-            file_name = os.path.basename(file_path)
-            self.file_name_label.configure(
-                text=file_name[:20] + "..." if len(file_name) > 20 else file_name
-            )
-            
-            self.save_button.configure(state=tk.NORMAL)
-            self._on_settings_change()
-            
-            self.original_size_label.configure(
-                text=format_file_size(self.original_file_size)
+        self._load_gen += 1
+        future = self._executor.submit(self._decode_image, file_path)
+        future.add_done_callback(
+            lambda done, generation=self._load_gen, path=file_path: self._post_to_ui(
+                self._on_load_done, generation, path, done
             )
-            
+        )
+
+    def _decode_image(self, file_path: str) -> tuple:
+        """runs on the worker thread - decode, release the file handle, downsample for drafts"""
+        with Image.open(file_path) as image:
+            image.load()
+            decoded = image.copy()
+        
+        preview_source = resize_for_preview(decoded, max_width=800, max_height=600)
+        return decoded, get_file_size(file_path), preview_source
+
+    def _on_load_done(self, generation: int, file_path: str, future: Future) -> None:
+        """show a decoded image unless it was cleared or another load started"""
+        if generation != self._load_gen:
+            return
+        
+        try:
+            self.original_image, self.original_file_size, self._preview_source = future.result()
         except Exception as error:
             messagebox.showerror("Error", f"Failed to load image: {str(error)}")
+            return
+        
+        self._transform_cache.clear()
+        self._last_params = None
+        
+        file_name = os.path.basename(file_path)
+        self.file_name_label.configure(
+            text=file_name[:20] + "..." if len(file_name) > 20 else file_name
+        )
+        
+        self._on_settings_change()
+        
+        self.original_size_label.configure(
+            text=format_file_size(self.original_file_size)
+        )
     
     def _save_image(self) -> None:
         """save image button handler"""
@@ -550,30 +696,12 @@ class TransWritesApp:
         
         selected_format = self.format_var.get().lower()
         default_extension = f".{selected_format}"
-
-        # Windows uses the first entry as the default file type.
-        format_filetypes = {
-            'png': ("PNG files", "*.png"),
-            'webp': ("WebP files (lossless)", "*.webp"),
-            'jxl': ("JPEG XL files (lossless)", "*.jxl"),
-            'bmp': ("BMP files", "*.bmp")
-        }
-        filetypes = [format_filetypes[selected_format]]
-
-        for format_name, filetype in format_filetypes.items():
-            if format_name == selected_format:
-                continue
-            if format_name == 'jxl' and not HAS_JXL:
-                continue
-            filetypes.append(filetype)
-
-        filetypes.append(("All files", "*.*"))
         
         file_path = filedialog.asksaveasfilename(
             title="Save Image",
             initialfile="TRANS RIGHTS!!!!",
             defaultextension=default_extension,
-            filetypes=filetypes
+            filetypes=self._filetypes_by_format[selected_format]
         )
         
         if not file_path:
@@ -597,6 +725,26 @@ class TransWritesApp:
         except Exception as error:
             messagebox.showerror("Error", f"Failed to save: {str(error)}")
 
+    def _build_save_filetypes(self) -> Dict[str, list]:
+        """save dialog filetypes for each format, selected format first"""
+        filetypes_by_format = {}
+        
+        for selected_format, selected_filetype in SAVE_FILETYPES.items():
+            # Windows uses the first entry as the default file type.
+            filetypes = [selected_filetype]
+            
+            for format_name, filetype in SAVE_FILETYPES.items():
+                if format_name == selected_format:
+                    continue
+                if format_name == 'jxl' and not HAS_JXL:
+                    continue
+                filetypes.append(filetype)
+            
+            filetypes.append(("All files", "*.*"))
+            filetypes_by_format[selected_format] = filetypes
+        
+        return filetypes_by_format
+
     def _save_jxl(self, file_path: str) -> None:
         """save image as lossless jpeg xl"""
         if not HAS_JXL:
@@ -637,19 +785,167 @@ class TransWritesApp:
         self._on_settings_change()
     
     def _on_settings_change(self) -> None:
-        """settings changed - update preview and file sizes"""
+        """settings changed - schedule a recompute, collapsing rapid events into one"""
+        # transformed_image is stale until the result for these settings comes in
+        self.save_button.configure(state=tk.DISABLED)
+        if self._pending_job is not None:
+            self.root.after_cancel(self._pending_job)
+        self._pending_job = self.root.after(150, self._do_settings_change)
+
+    def _settings_key(self) -> tuple:
+        """transform cache key for the loaded image and the current settings"""
+        return (
+            id(self.original_image),
+            self.dithering_method.get(),
+            int(self.pixelation_size.get()),
+            self.invert_colors.get()
+        )
+
+    def _do_settings_change(self) -> None:
+        """hand the transform and size estimate off to the worker thread"""
+        self._pending_job = None
         if self.original_image is None:
             return
         
-        self.transformed_image = apply_transforms(
+        key = self._settings_key()
+        _, dithering, pixelation, invert = key
+        
+        # e.g. slider release followed by the entry's FocusOut with the same value;
+        # checked before bumping the generation so an in-flight job isn't discarded
+        if key == self._last_params:
+            if self._transform_future is None:
+                self.save_button.configure(state=tk.NORMAL)
+            return
+        self._last_params = key
+        self._job_gen += 1
+        self._cancel_transform_jobs()
+        self.save_button.configure(state=tk.DISABLED)
+        
+        if key in self._transform_cache:
+            self._transform_cache.move_to_end(key)
+            self._show_result(key, *self._transform_cache[key])
+            return
+        
+        # large image at 1x: show a cheap transform of the small copy first,
+        # the full-res result replaces it once the worker gets through it
+        if self._preview_source is not self.original_image and self.zoom_level == 1.0:
+            scale = self._preview_source.width / self.original_image.width
+            draft_future = self._draft_future = self._executor.submit(
+                apply_transforms,
+                self._preview_source,
+                dithering=dithering,
+                pixelation=max(1, round(pixelation * scale)),
+                invert=invert
+            )
+            draft_future.add_done_callback(
+                lambda done, generation=self._job_gen: self._post_to_ui(
+                    self._apply_draft_result, generation, done
+                )
+            )
+        
+        future = self._transform_future = self._executor.submit(
+            self._transform_job,
             self.original_image,
-            dithering=self.dithering_method.get(),
-            pixelation=int(self.pixelation_size.get()),
-            invert=self.invert_colors.get()
+            dithering,
+            pixelation,
+            invert,
+            self.format_var.get()
+        )
+        future.add_done_callback(
+            lambda done, generation=self._job_gen, key=key: self._post_to_ui(
+                self._apply_result, generation, key, done
+            )
+        )
+
+    def _cancel_transform_jobs(self) -> None:
+        """cancel queued draft and full-res jobs (one already running finishes unseen)"""
+        for future in (self._draft_future, self._transform_future):
+            if future is not None:
+                future.cancel()
+        self._draft_future = None
+        self._transform_future = None
+
+    def _transform_job(
+        self,
+        image: Image.Image,
+        dithering: str,
+        pixelation: int,
+        invert: bool,
+        output_format: str
+    ) -> tuple:
+        """runs on the worker thread - transform and estimate the selected format"""
+        transformed = apply_transforms(
+            image,
+            dithering=dithering,
+            pixelation=pixelation,
+            invert=invert
+        )
+        estimated_size = self._size_estimators[output_format](
+            transformed,
+            self._worker_size_buffer
+        )
+        return transformed, {output_format: estimated_size}
+
+    def _post_to_ui(self, callback, *args) -> None:
+        """marshal a finished worker job back onto the Tk thread"""
+        try:
+            self.root.after(0, callback, *args)
+        except (RuntimeError, tk.TclError):
+            # window was closed while the job was running
+            pass
+
+    def _apply_result(self, generation: int, key: tuple, future: Future) -> None:
+        """update preview and file sizes unless a newer job superseded this one"""
+        if generation != self._job_gen:
+            return
+        
+        try:
+            transformed, estimated_sizes = future.result()
+        except Exception as error:
+            self._last_params = None
+            self._transform_future = None
+            messagebox.showerror("Error", f"Failed to transform image: {str(error)}")
+            return
+        
+        self._transform_cache[key] = (transformed, estimated_sizes)
+        if len(self._transform_cache) > self._transform_cache_size:
+            self._transform_cache.popitem(last=False)
+        
+        self._show_result(key, transformed, estimated_sizes)
+
+    def _apply_draft_result(self, generation: int, future: Future) -> None:
+        """show the low-res draft while the full transform is still running"""
+        if generation != self._job_gen or self.zoom_level != 1.0:
+            return
+        if future.exception() is not None:
+            # the full-res job will report the error
+            return
+        
+        preview_image = resize_for_preview(
+            future.result(),
+            max_width=self._preview_max_size[0],
+            max_height=self._preview_max_size[1]
         )
+        self._set_preview_photo(preview_image)
+        self._draw_preview_photo()
+        self._last_drawn = None
+
+    def _show_result(
+        self,
+        key: tuple,
+        transformed: Image.Image,
+        estimated_sizes: Dict[str, int]
+    ) -> None:
+        """update preview and file sizes for a transformed image"""
+        self.transformed_image = transformed
+        self._transform_future = None
+        # a job for the old settings can land while a change is still debouncing
+        if key == self._settings_key():
+            self.save_button.configure(state=tk.NORMAL)
+        self._clear_preview_cache()
         
         self._update_preview()
-        self._update_file_info()
+        self._update_file_info(estimated_sizes)
     
     def _update_preview(self) -> None:
         """update preview canvas"""
@@ -657,24 +953,79 @@ class TransWritesApp:
             self._show_placeholder()
             return
         
-        if self.zoom_level != 1.0:
-            new_width = int(self.transformed_image.width * self.zoom_level)
-            new_height = int(self.transformed_image.height * self.zoom_level)
-            preview_image = self.transformed_image.resize((new_width, new_height), Image.Resampling.NEAREST)
+        key = (id(self.transformed_image), round(self.zoom_level, 3))
+        if key == self._last_drawn:
+            return
+        self._last_drawn = key
+        
+        if key in self._preview_cache:
+            self._preview_cache.move_to_end(key)
+            preview_image, self.preview_photo = self._preview_cache[key]
         else:
-            preview_image = resize_for_preview(
-                self.transformed_image,
-                max_width=600,
-                max_height=450
-            )
+            if self.zoom_level != 1.0:
+                new_width = int(self.transformed_image.width * self.zoom_level)
+                new_height = int(self.transformed_image.height * self.zoom_level)
+                preview_image = self.transformed_image.resize((new_width, new_height), Image.Resampling.NEAREST)
+            else:
+                preview_image = resize_for_preview(
+                    self.transformed_image,
+                    max_width=self._preview_max_size[0],
+                    max_height=self._preview_max_size[1]
+                )
+
+            self._set_preview_photo(preview_image)
+            self._cache_preview(key, preview_image)
         
-        self.preview_photo = ImageTk.PhotoImage(preview_image)
+        self._draw_preview_photo()
+
+    def _cache_preview(self, key: tuple, preview_image: Image.Image) -> None:
+        """remember the current preview, evicting the oldest until it fits the budget"""
+        pixels = preview_image.width * preview_image.height
+        if pixels > self._preview_cache_max_pixels:
+            return
         
-        self.preview_canvas.delete("all")
+        self._preview_cache[key] = (preview_image, self.preview_photo)
+        self._preview_cache_pixels += pixels
+        while (
+            len(self._preview_cache) > self._preview_cache_size
+            or self._preview_cache_pixels > self._preview_cache_max_pixels
+        ):
+            evicted_image, _ = self._preview_cache.popitem(last=False)[1]
+            self._preview_cache_pixels -= evicted_image.width * evicted_image.height
+
+    def _clear_preview_cache(self) -> None:
+        """drop all cached previews"""
+        self._preview_cache.clear()
+        self._preview_cache_pixels = 0
+
+    def _set_preview_photo(self, preview_image: Image.Image) -> None:
+        """point preview_photo at the given pixels"""
+        if self._can_reuse_photo(preview_image.size):
+            # blit into the photo already on screen instead of allocating a new one
+            self.preview_photo.paste(preview_image)
+        else:
+            self.preview_photo = ImageTk.PhotoImage(preview_image)
+
+    def _draw_preview_photo(self) -> None:
+        """put preview_photo on the canvas"""
         self.preview_canvas.configure(
-            scrollregion=(0, 0, preview_image.width, preview_image.height)
+            scrollregion=(0, 0, self.preview_photo.width(), self.preview_photo.height())
         )
-        self.preview_canvas.create_image(0, 0, anchor=tk.NW, image=self.preview_photo)
+        if self._img_item is None:
+            self.preview_canvas.delete("all")
+            self._img_item = self.preview_canvas.create_image(
+                0, 0, anchor=tk.NW, image=self.preview_photo
+            )
+        else:
+            self.preview_canvas.itemconfig(self._img_item, image=self.preview_photo)
+
+    def _can_reuse_photo(self, size: tuple) -> bool:
+        """whether the current photo matches size and no cached preview still needs it"""
+        if self.preview_photo is None:
+            return False
+        if (self.preview_photo.width(), self.preview_photo.height()) != size:
+            return False
+        return all(photo is not self.preview_photo for _, photo in self._preview_cache.values())
     
     def _on_mouse_wheel(self, event) -> None:
         """mouse wheel zoom"""
@@ -682,44 +1033,80 @@ class TransWritesApp:
             return
         
         if event.num == 4 or event.delta > 0:
-            factor = 1.1
+            step = 1
         elif event.num == 5 or event.delta < 0:
-            factor = 0.9
+            step = -1
         else:
             return
         
-        new_zoom = self.zoom_level * factor
-        new_zoom = max(0.1, min(10.0, new_zoom))
+        # +-24 steps keeps zoom within roughly 0.1x to 10x
+        new_step = max(-24, min(24, self._zoom_step + step))
         
-        if new_zoom != self.zoom_level:
-            self.zoom_level = new_zoom
-            self._update_preview()
+        if new_step != self._zoom_step:
+            self._zoom_step = new_step
+            self.zoom_level = 1.1 ** new_step if new_step else 1.0
+            # only resize once the wheel goes idle, not on every notch
+            self._cancel_zoom_job()
+            self._zoom_job = self.root.after(150, self._finalize_zoom)
     
+    def _finalize_zoom(self) -> None:
+        """redraw the preview at the settled zoom level"""
+        self._zoom_job = None
+        self._update_preview()
+
+    def _cancel_zoom_job(self) -> None:
+        """drop a pending zoom redraw"""
+        if self._zoom_job is not None:
+            self.root.after_cancel(self._zoom_job)
+            self._zoom_job = None
+
+    def _on_canvas_resize(self, _event) -> None:
+        """canvas resized - refit once the drag settles"""
+        if self._resize_job is not None:
+            self.root.after_cancel(self._resize_job)
+        self._resize_job = self.root.after(200, self._finalize_canvas_resize)
+
+    def _finalize_canvas_resize(self) -> None:
+        """refit the 1x preview to the settled canvas size"""
+        self._resize_job = None
+        border = 2 * int(self.preview_canvas.cget('highlightthickness'))
+        new_size = (
+            max(1, self.preview_canvas.winfo_width() - border),
+            max(1, self.preview_canvas.winfo_height() - border)
+        )
+        if new_size == self._preview_max_size:
+            return
+        
+        self._preview_max_size = new_size
+        # cached 1x previews were fitted to the old size
+        self._clear_preview_cache()
+        self._last_drawn = None
+        self._update_preview()
+
     def _on_zoom_reset(self, _event) -> None:
         """reset zoom on double-click"""
-        if self.zoom_level != 1.0:
+        self._cancel_zoom_job()
+        if self._zoom_step != 0:
+            self._zoom_step = 0
             self.zoom_level = 1.0
             self._update_preview()
     
-    def _update_file_info(self) -> None:
+    def _update_file_info(self, estimated_sizes: Optional[Dict[str, int]] = None) -> None:
         """Discard stale estimates and refresh the selected format."""
         self._estimated_size_by_format.clear()
+        if estimated_sizes:
+            self._estimated_size_by_format.update(estimated_sizes)
         self._update_size_display()
 
     def _estimate_output_size(self, output_format: str) -> int:
         if self.transformed_image is None:
             return 0
 
-        estimators = {
-            'PNG': estimate_png_size,
-            'WebP': estimate_webp_size,
-            'JXL': estimate_jxl_size,
-            'BMP': estimate_bmp_size,
-        }
         if output_format not in self._estimated_size_by_format:
-            estimator = estimators[output_format]
+            estimator = self._size_estimators[output_format]
             self._estimated_size_by_format[output_format] = estimator(
-                self.transformed_image
+                self.transformed_image,
+                self._size_buffer
             )
         return self._estimated_size_by_format[output_format]
 
@@ -751,7 +1138,12 @@ class TransWritesApp:
     def _show_placeholder(self) -> None:
         """show placeholder text"""
         self.preview_canvas.delete("all")
-        self.preview_canvas.update_idletasks()
+        self._img_item = None
+        self._last_drawn = None
+        # only force a layout pass when the canvas has no real size yet (startup);
+        # otherwise it flushes every pending redraw from the caller's batch of updates
+        if self.preview_canvas.winfo_width() <= 1:
+            self.preview_canvas.update_idletasks()
         
         width = max(self.preview_canvas.winfo_width(), 400)
         height = max(self.preview_canvas.winfo_height(), 300)
@@ -779,11 +1171,25 @@ class TransWritesApp:
     
     def _clear_image(self) -> None:
         """clear image and reset app"""
+        if self._pending_job is not None:
+            self.root.after_cancel(self._pending_job)
+            self._pending_job = None
+        self._job_gen += 1
+        self._load_gen += 1
+        self._cancel_transform_jobs()
+
         self.original_image = None
         self.original_file_size = 0
         self.transformed_image = None
         self.preview_photo = None
+        self._clear_preview_cache()
+        self._transform_cache.clear()
+        self._last_params = None
+        self._preview_source = None
         self._estimated_size_by_format.clear()
+        # let go of the encode buffers' memory
+        self._size_buffer = BytesIO()
+        self._worker_size_buffer = BytesIO()
         
         self.dithering_method.set('none')
         self.pixelation_size.set(1)
@@ -794,7 +1200,9 @@ class TransWritesApp:
         self.format_var.set('PNG')
         self.invert_button.config(text="♥ Invert Colors ♥")
         
+        self._zoom_step = 0
         self.zoom_level = 1.0
+        self._cancel_zoom_job()
         
         self.file_name_label.configure(text="No image loaded")
         self.save_button.configure(state=tk.DISABLED)
@@ -831,6 +1239,8 @@ class TransWritesApp:
     
     def _on_close(self) -> None:
         """window close handler"""
+        self._job_gen += 1
+        self._executor.shutdown()
         self.root.destroy()
 
 
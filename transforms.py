@@ -1,3 +1,7 @@
+import glob
+import os
+from typing import Optional
+
 import numpy as np
 from PIL import Image
 
@@ -5,12 +9,13 @@ from utils import (
     TRANS_PALETTE,
     INVERTED_PALETTE,
     find_nearest_color_bulk,
+    find_nearest_color_rgb_bulk,
     HAS_SKIMAGE
 )
 
 # numba is optional but gives big speedup (just install it brah)
 try:
-    from numba import jit, prange
+    from numba import config, jit, prange, set_num_threads
     HAS_NUMBA = True
 except ImportError:
     HAS_NUMBA = False
@@ -23,6 +28,38 @@ except ImportError:
     prange = range
 
 
+def _physical_core_count() -> int:
+    """physical cores on linux (hyperthread siblings counted once), logical cpus elsewhere"""
+    siblings = set()
+    for path in glob.glob('/sys/devices/system/cpu/cpu[0-9]*/topology/thread_siblings_list'):
+        try:
+            with open(path) as siblings_file:
+                siblings.add(siblings_file.read().strip())
+        except OSError:
+            pass
+    
+    return len(siblings) or os.cpu_count() or 1
+
+
+def limit_numba_threads() -> None:
+    """cap numba's thread pool at one thread per physical core"""
+    # numba keeps the count per thread, so every thread that runs the parallel
+    # kernels has to call this itself (the gui does it when its worker starts);
+    # hyperthreads just fight over the same cache
+    if HAS_NUMBA:
+        set_num_threads(max(1, min(config.NUMBA_NUM_THREADS, _physical_core_count())))
+
+
+limit_numba_threads()
+
+# cupy is optional too, only worth it for big images on a machine with a cuda gpu
+try:
+    import cupy as cp
+    HAS_CUPY = cp.cuda.is_available()
+except ImportError:
+    HAS_CUPY = False
+
+
 BAYER_MATRIX = np.array([
     [ 0,  8,  2, 10],
     [12,  4, 14,  6],
@@ -30,172 +67,610 @@ BAYER_MATRIX = np.array([
     [15,  7, 13,  5]
 ], dtype=np.float32) / 16.0
 
+# per-pixel channel offset for ordered dithering, whole numbers in [-32, 28]
+_BAYER_OFFSET = ((BAYER_MATRIX - 0.5) * 64.0).astype(np.int16)
+
 _TRANS_PALETTE_ARRAY = np.array(TRANS_PALETTE, dtype=np.uint8)
+_INVERTED_PALETTE_ARRAY = np.array(INVERTED_PALETTE, dtype=np.uint8)
+
+# palette bytes -> nearest palette index for every packed 24-bit rgb value;
+# only the built-in palettes get one, a table is 16 MB and ~0.4 s to build
+_PALETTE_LUTS = {}
+_LUT_PALETTE_KEYS = {_TRANS_PALETTE_ARRAY.tobytes(), _INVERTED_PALETTE_ARRAY.tobytes()}
+# stands in for the table with other palettes, the kernels scan the palette instead
+_NO_LUT = np.empty(0, dtype=np.uint8)
+
+# below this many pixels starting the numba thread pool costs more than it saves
+_SERIAL_MAX_PIXELS = 200_000
+
+# below this many pixels the host <-> device copies cost more than they save
+_GPU_MIN_PIXELS = 500_000
+
+# one thread per pixel; integer weighted rgb distance, same result as the cpu kernels
+_GPU_PALETTE_SOURCE = r'''
+extern "C" __global__
+void palette_map(
+    const unsigned char* pixels,
+    unsigned char* output,
+    const int* palette,
+    int palette_size,
+    const int* bayer_offset,
+    int width,
+    long long pixel_count
+) {
+    long long i = (long long)blockDim.x * blockIdx.x + threadIdx.x;
+    if (i >= pixel_count) {
+        return;
+    }
+
+    int y = (int)(i / width);
+    int x = (int)(i % width);
+    int offset = bayer_offset[(y & 3) * 4 + (x & 3)];
+    int r = pixels[i * 3] + offset;
+    int g = pixels[i * 3 + 1] + offset;
+    int b = pixels[i * 3 + 2] + offset;
+
+    int best_idx = 0;
+    long long min_dist = 0x7fffffffffffffffLL;
+    for (int k = 0; k < palette_size; k++) {
+        long long dr = r - palette[k * 3];
+        long long dg = g - palette[k * 3 + 1];
+        long long db = b - palette[k * 3 + 2];
+        long long dist = 2 * dr * dr + 4 * dg * dg + 3 * db * db;
+        if (dist < min_dist) {
+            min_dist = dist;
+            best_idx = k;
+        }
+    }
+
+    output[i * 3] = (unsigned char)palette[best_idx * 3];
+    output[i * 3 + 1] = (unsigned char)palette[best_idx * 3 + 1];
+    output[i * 3 + 2] = (unsigned char)palette[best_idx * 3 + 2];
+}
+'''
+
+if HAS_CUPY:
+    # compile now so a missing nvrtc or a driver mismatch turns the gpu path off
+    # here instead of failing the first big transform
+    try:
+        _GPU_PALETTE_KERNEL = cp.RawKernel(_GPU_PALETTE_SOURCE, 'palette_map')
+        _GPU_PALETTE_KERNEL.compile()
+    except Exception:
+        HAS_CUPY = False
+
+
+def _palette_array(palette) -> np.ndarray:
+    """palette as a uint8 array, reusing the module arrays for the built-in palettes"""
+    if isinstance(palette, np.ndarray):
+        return palette.astype(np.uint8, copy=False)
+    if not palette or palette is TRANS_PALETTE:
+        return _TRANS_PALETTE_ARRAY
+    if palette is INVERTED_PALETTE:
+        return _INVERTED_PALETTE_ARRAY
+    
+    return np.array(palette, dtype=np.uint8)
+
 
+def _split_palette_channels(palette: np.ndarray) -> tuple:
+    """split a palette into contiguous float32 r, g, b arrays"""
+    palette_float = palette.astype(np.float32)
+    return tuple(np.ascontiguousarray(palette_float[:, c]) for c in range(3))
 
-@jit(nopython=True, cache=True)
-def _find_nearest_color_idx_rgb(pixel: np.ndarray, palette: np.ndarray) -> int:
+
+# the two built-in palettes are split once at import
+_TRANS_PALETTE_CHANNELS = _split_palette_channels(_TRANS_PALETTE_ARRAY)
+_INVERTED_PALETTE_CHANNELS = _split_palette_channels(_INVERTED_PALETTE_ARRAY)
+
+
+def _palette_channels(palette: np.ndarray) -> tuple:
+    """float32 r, g, b arrays for a palette, precomputed for the built-in ones"""
+    if palette is _TRANS_PALETTE_ARRAY:
+        return _TRANS_PALETTE_CHANNELS
+    if palette is _INVERTED_PALETTE_ARRAY:
+        return _INVERTED_PALETTE_CHANNELS
+    
+    return _split_palette_channels(palette)
+
+
+@jit(nopython=True, cache=True, fastmath=True, boundscheck=False, error_model='numpy')
+def _find_nearest_color_idx_rgb(
+    pixel: np.ndarray,
+    palette_r: np.ndarray,
+    palette_g: np.ndarray,
+    palette_b: np.ndarray
+) -> int:
     """find nearest color using weighted rgb distance"""
-    min_dist = float('inf')
-    best_idx = 0
+    # palette comes in as separate channel arrays so llvm sees three contiguous
+    # streams, and the min tracking is select-based rather than branching
+    r, g, b = pixel[0], pixel[1], pixel[2]
+    
+    # error diffusion often lands a pixel right on a palette color
+    for i in range(len(palette_r)):
+        if r == palette_r[i] and g == palette_g[i] and b == palette_b[i]:
+            return i
     
     weights_r, weights_g, weights_b = 2.0, 4.0, 3.0
     
-    for i in range(len(palette)):
-        dr = pixel[0] - palette[i, 0]
-        dg = pixel[1] - palette[i, 1]
-        db = pixel[2] - palette[i, 2]
+    dr = r - palette_r[0]
+    dg = g - palette_g[0]
+    db = b - palette_b[0]
+    min_dist = weights_r * dr * dr + weights_g * dg * dg + weights_b * db * db
+    best_idx = 0
+    
+    for i in range(1, len(palette_r)):
+        dr = r - palette_r[i]
+        dg = g - palette_g[i]
+        db = b - palette_b[i]
         dist = weights_r * dr * dr + weights_g * dg * dg + weights_b * db * db
         
-        if dist < min_dist:
-            min_dist = dist
-            best_idx = i
+        closer = dist < min_dist
+        min_dist = dist if closer else min_dist
+        best_idx = i if closer else best_idx
     
     return best_idx
 
 
-@jit(nopython=True, parallel=True, cache=True)
-def _apply_palette_numba(pixels: np.ndarray, palette: np.ndarray) -> np.ndarray:
+@jit(nopython=True, parallel=True, cache=True, fastmath=True, boundscheck=False, error_model='numpy')
+def _build_palette_lut(
+    palette_r: np.ndarray,
+    palette_g: np.ndarray,
+    palette_b: np.ndarray
+) -> np.ndarray:
+    """nearest palette index for every 24-bit rgb value (16 MB)"""
+    lut = np.empty(256 * 256 * 256, dtype=np.uint8)
+    
+    for r in prange(256):
+        # signed ints so channel differences can't wrap like uint8 - uint8 does
+        pixel = np.empty(3, dtype=np.int64)
+        pixel[0] = r
+        for g in range(256):
+            pixel[1] = g
+            for b in range(256):
+                pixel[2] = b
+                lut[(r << 16) | (g << 8) | b] = _find_nearest_color_idx_rgb(
+                    pixel, palette_r, palette_g, palette_b
+                )
+    
+    return lut
+
+
+def _get_palette_lut(palette: np.ndarray) -> np.ndarray:
+    """get the lookup table for a built-in palette (built on first use), empty otherwise"""
+    key = palette.tobytes()
+    
+    if key not in _LUT_PALETTE_KEYS:
+        return _NO_LUT
+    if key not in _PALETTE_LUTS:
+        _PALETTE_LUTS[key] = _build_palette_lut(*_palette_channels(palette))
+    
+    return _PALETTE_LUTS[key]
+
+
+@jit(nopython=True, cache=True, fastmath=True, boundscheck=False, error_model='numpy')
+def _apply_palette_row(
+    pixels: np.ndarray,
+    palette: np.ndarray,
+    palette_r: np.ndarray,
+    palette_g: np.ndarray,
+    palette_b: np.ndarray,
+    lut: np.ndarray,
+    output: np.ndarray,
+    y: int
+):
+    """apply palette to one row of pixels"""
+    has_lut = len(lut) > 0
+    for x in range(pixels.shape[1]):
+        r = np.int64(pixels[y, x, 0])
+        g = np.int64(pixels[y, x, 1])
+        b = np.int64(pixels[y, x, 2])
+        
+        if has_lut:
+            idx = lut[(r << 16) | (g << 8) | b]
+        else:
+            idx = _find_nearest_color_idx_rgb((r, g, b), palette_r, palette_g, palette_b)
+        output[y, x, 0] = palette[idx, 0]
+        output[y, x, 1] = palette[idx, 1]
+        output[y, x, 2] = palette[idx, 2]
+
+
+@jit(nopython=True, parallel=True, cache=True, fastmath=True, boundscheck=False, error_model='numpy')
+def _apply_palette_numba(
+    pixels: np.ndarray,
+    palette: np.ndarray,
+    palette_r: np.ndarray,
+    palette_g: np.ndarray,
+    palette_b: np.ndarray,
+    lut: np.ndarray
+) -> np.ndarray:
     """apply palette to all pixels in parallel"""
     height, width = pixels.shape[:2]
     output = np.empty((height, width, 3), dtype=np.uint8)
     
     for y in prange(height):
-        for x in range(width):
-            idx = _find_nearest_color_idx_rgb(pixels[y, x], palette)
-            output[y, x, 0] = palette[idx, 0]
-            output[y, x, 1] = palette[idx, 1]
-            output[y, x, 2] = palette[idx, 2]
+        _apply_palette_row(pixels, palette, palette_r, palette_g, palette_b, lut, output, y)
+    
+    return output
+
+
+@jit(nopython=True, cache=True, fastmath=True, boundscheck=False, error_model='numpy')
+def _apply_palette_numba_serial(
+    pixels: np.ndarray,
+    palette: np.ndarray,
+    palette_r: np.ndarray,
+    palette_g: np.ndarray,
+    palette_b: np.ndarray,
+    lut: np.ndarray
+) -> np.ndarray:
+    """apply palette to all pixels on the calling thread"""
+    height, width = pixels.shape[:2]
+    output = np.empty((height, width, 3), dtype=np.uint8)
+    
+    for y in range(height):
+        _apply_palette_row(pixels, palette, palette_r, palette_g, palette_b, lut, output, y)
     
     return output
 
 
-@jit(nopython=True, cache=True)
-def _dither_floyd_steinberg_numba(pixels: np.ndarray, palette: np.ndarray) -> np.ndarray:
+def _use_serial(pixels: np.ndarray) -> bool:
+    """whether an image is too small to be worth the numba thread pool"""
+    return pixels.shape[0] * pixels.shape[1] < _SERIAL_MAX_PIXELS
+
+
+def _use_gpu(pixels: np.ndarray) -> bool:
+    """whether an image is big enough to send to the gpu"""
+    return HAS_CUPY and pixels.shape[0] * pixels.shape[1] >= _GPU_MIN_PIXELS
+
+
+def _try_palette_map_gpu(
+    pixels: np.ndarray,
+    palette: np.ndarray,
+    bayer_offset: np.ndarray = None
+) -> Optional[np.ndarray]:
+    """gpu palette mapping, or None if the gpu failed (the cpu takes over from then on)"""
+    global HAS_CUPY
+    
+    try:
+        return _palette_map_gpu(pixels, palette, bayer_offset)
+    except Exception:
+        HAS_CUPY = False
+        return None
+
+
+def _palette_map_gpu(
+    pixels: np.ndarray,
+    palette: np.ndarray,
+    bayer_offset: np.ndarray = None
+) -> np.ndarray:
+    """map pixels to the palette on the gpu, with optional ordered dithering"""
+    height, width = pixels.shape[:2]
+    pixel_count = height * width
+    
+    if bayer_offset is None:
+        bayer_offset = np.zeros((4, 4), dtype=np.int32)
+    
+    pixels_gpu = cp.asarray(np.ascontiguousarray(pixels))
+    output_gpu = cp.empty_like(pixels_gpu)
+    palette_gpu = cp.asarray(palette.astype(np.int32))
+    offset_gpu = cp.asarray(bayer_offset.astype(np.int32))
+    
+    threads = 256
+    blocks = (pixel_count + threads - 1) // threads
+    _GPU_PALETTE_KERNEL(
+        (blocks,),
+        (threads,),
+        (
+            pixels_gpu,
+            output_gpu,
+            palette_gpu,
+            np.int32(len(palette)),
+            offset_gpu,
+            np.int32(width),
+            np.int64(pixel_count)
+        )
+    )
+    
+    return cp.asnumpy(output_gpu)
+
+
+@jit(nopython=True, cache=True, fastmath=True, boundscheck=False, error_model='numpy')
+def _diffuse_error(
+    row: np.ndarray,
+    x: int,
+    error_r: float,
+    error_g: float,
+    error_b: float,
+    weight: float
+) -> None:
+    """add a share of the quantization error to one pixel of a row"""
+    row[x, 0] += error_r * weight
+    row[x, 1] += error_g * weight
+    row[x, 2] += error_b * weight
+
+
+@jit(nopython=True, cache=True, fastmath=True, boundscheck=False, error_model='numpy')
+def _dither_floyd_steinberg_numba(
+    pixels: np.ndarray,
+    palette: np.ndarray,
+    palette_r: np.ndarray,
+    palette_g: np.ndarray,
+    palette_b: np.ndarray
+) -> np.ndarray:
     """floyd-steinberg dithering"""
     height, width = pixels.shape[:2]
-    result = pixels.astype(np.float32).copy()
+    output = np.empty((height, width, 3), dtype=np.uint8)
+    
+    # error only ever reaches the next row, so two float rows are the whole
+    # working set and the row being diffused into is still hot in cache
+    row = np.empty((width, 3), dtype=np.float32)
+    next_row = np.empty((width, 3), dtype=np.float32)
+    row[:] = pixels[0]
     
     for y in range(height):
+        has_next_row = y + 1 < height
+        if has_next_row:
+            next_row[:] = pixels[y + 1]
+        
         for x in range(width):
-            old_pixel = result[y, x].copy()
+            # plain scalars all the way, no per-pixel array temporaries
+            old_r = row[x, 0]
+            old_g = row[x, 1]
+            old_b = row[x, 2]
             
-            idx = _find_nearest_color_idx_rgb(old_pixel, palette)
-            new_pixel = palette[idx].astype(np.float32)
-            result[y, x] = new_pixel
+            idx = _find_nearest_color_idx_rgb(
+                (old_r, old_g, old_b), palette_r, palette_g, palette_b
+            )
+            output[y, x, 0] = palette[idx, 0]
+            output[y, x, 1] = palette[idx, 1]
+            output[y, x, 2] = palette[idx, 2]
             
-            error = old_pixel - new_pixel
+            error_r = old_r - palette_r[idx]
+            error_g = old_g - palette_g[idx]
+            error_b = old_b - palette_b[idx]
             
             # distribute error to neighbors
             if x + 1 < width:
-                result[y, x + 1] += error * (7.0 / 16.0)
-            if y + 1 < height:
+                _diffuse_error(row, x + 1, error_r, error_g, error_b, 7.0 / 16.0)
+            if has_next_row:
                 if x > 0:
-                    result[y + 1, x - 1] += error * (3.0 / 16.0)
-                result[y + 1, x] += error * (5.0 / 16.0)
+                    _diffuse_error(next_row, x - 1, error_r, error_g, error_b, 3.0 / 16.0)
+                _diffuse_error(next_row, x, error_r, error_g, error_b, 5.0 / 16.0)
                 if x + 1 < width:
-                    result[y + 1, x + 1] += error * (1.0 / 16.0)
+                    _diffuse_error(next_row, x + 1, error_r, error_g, error_b, 1.0 / 16.0)
+        
+        row, next_row = next_row, row
     
-    return np.clip(result, 0, 255).astype(np.uint8)
+    return output
 
 
-@jit(nopython=True, cache=True)
-def _dither_atkinson_numba(pixels: np.ndarray, palette: np.ndarray) -> np.ndarray:
+@jit(nopython=True, cache=True, fastmath=True, boundscheck=False, error_model='numpy')
+def _dither_atkinson_numba(
+    pixels: np.ndarray,
+    palette: np.ndarray,
+    palette_r: np.ndarray,
+    palette_g: np.ndarray,
+    palette_b: np.ndarray
+) -> np.ndarray:
     """atkinson dithering"""
     height, width = pixels.shape[:2]
     result = pixels.astype(np.float32).copy()
     
     for y in range(height):
         for x in range(width):
-            old_pixel = result[y, x].copy()
+            # plain scalars all the way, no per-pixel array temporaries
+            old_r = result[y, x, 0]
+            old_g = result[y, x, 1]
+            old_b = result[y, x, 2]
             
-            idx = _find_nearest_color_idx_rgb(old_pixel, palette)
-            new_pixel = palette[idx].astype(np.float32)
-            result[y, x] = new_pixel
+            idx = _find_nearest_color_idx_rgb(
+                (old_r, old_g, old_b), palette_r, palette_g, palette_b
+            )
+            new_r = palette_r[idx]
+            new_g = palette_g[idx]
+            new_b = palette_b[idx]
+            result[y, x, 0] = new_r
+            result[y, x, 1] = new_g
+            result[y, x, 2] = new_b
             
-            error = old_pixel - new_pixel
+            error_r = old_r - new_r
+            error_g = old_g - new_g
+            error_b = old_b - new_b
             
             # atkinson pattern - 1/8 to each of 6 neighbors
             if x + 1 < width:
-                result[y, x + 1] += error * (1.0 / 8.0)
+                _diffuse_error(result[y], x + 1, error_r, error_g, error_b, 1.0 / 8.0)
             if x + 2 < width:
-                result[y, x + 2] += error * (1.0 / 8.0)
+                _diffuse_error(result[y], x + 2, error_r, error_g, error_b, 1.0 / 8.0)
             if y + 1 < height:
                 if x > 0:
-                    result[y + 1, x - 1] += error * (1.0 / 8.0)
-                result[y + 1, x] += error * (1.0 / 8.0)
+                    _diffuse_error(result[y + 1], x - 1, error_r, error_g, error_b, 1.0 / 8.0)
+                _diffuse_error(result[y + 1], x, error_r, error_g, error_b, 1.0 / 8.0)
                 if x + 1 < width:
-                    result[y + 1, x + 1] += error * (1.0 / 8.0)
+                    _diffuse_error(result[y + 1], x + 1, error_r, error_g, error_b, 1.0 / 8.0)
             if y + 2 < height:
-                result[y + 2, x] += error * (1.0 / 8.0)
+                _diffuse_error(result[y + 2], x, error_r, error_g, error_b, 1.0 / 8.0)
     
     return np.clip(result, 0, 255).astype(np.uint8)
 
 
-@jit(nopython=True, parallel=True, cache=True)
-def _dither_ordered_numba(pixels: np.ndarray, palette: np.ndarray, bayer: np.ndarray) -> np.ndarray:
-    """ordered (bayer) dithering"""
+@jit(nopython=True, cache=True, fastmath=True, boundscheck=False, error_model='numpy')
+def _dither_ordered_row(
+    pixels: np.ndarray,
+    palette: np.ndarray,
+    palette_r: np.ndarray,
+    palette_g: np.ndarray,
+    palette_b: np.ndarray,
+    bayer_offset: np.ndarray,
+    lut: np.ndarray,
+    output: np.ndarray,
+    y: int
+):
+    """ordered (bayer) dithering for one row"""
+    has_lut = len(lut) > 0
+    offset_row = bayer_offset[y & 3]
+    for x in range(pixels.shape[1]):
+        offset = np.int64(offset_row[x & 3])
+        r = np.int64(pixels[y, x, 0]) + offset
+        g = np.int64(pixels[y, x, 1]) + offset
+        b = np.int64(pixels[y, x, 2]) + offset
+        
+        if has_lut and 0 <= r <= 255 and 0 <= g <= 255 and 0 <= b <= 255:
+            idx = lut[(r << 16) | (g << 8) | b]
+        else:
+            # no table, or pushed past the rgb cube where the table doesn't reach
+            idx = _find_nearest_color_idx_rgb((r, g, b), palette_r, palette_g, palette_b)
+        output[y, x, 0] = palette[idx, 0]
+        output[y, x, 1] = palette[idx, 1]
+        output[y, x, 2] = palette[idx, 2]
+
+
+@jit(nopython=True, parallel=True, cache=True, fastmath=True, boundscheck=False, error_model='numpy')
+def _dither_ordered_numba(
+    pixels: np.ndarray,
+    palette: np.ndarray,
+    palette_r: np.ndarray,
+    palette_g: np.ndarray,
+    palette_b: np.ndarray,
+    bayer_offset: np.ndarray,
+    lut: np.ndarray
+) -> np.ndarray:
+    """ordered (bayer) dithering in parallel"""
     height, width = pixels.shape[:2]
     output = np.empty((height, width, 3), dtype=np.uint8)
     
     for y in prange(height):
-        for x in range(width):
-            threshold = bayer[y % 4, x % 4]
-            offset = (threshold - 0.5) * 64.0
-            adjusted = pixels[y, x].astype(np.float32) + offset
-            
-            idx = _find_nearest_color_idx_rgb(adjusted, palette)
-            output[y, x, 0] = palette[idx, 0]
-            output[y, x, 1] = palette[idx, 1]
-            output[y, x, 2] = palette[idx, 2]
+        _dither_ordered_row(
+            pixels, palette, palette_r, palette_g, palette_b, bayer_offset, lut, output, y
+        )
     
     return output
 
 
-def apply_trans_palette(image: Image.Image, palette: list = None) -> Image.Image:
-    """reduce image to trans flag palette (7 colors)"""
+@jit(nopython=True, cache=True, fastmath=True, boundscheck=False, error_model='numpy')
+def _dither_ordered_numba_serial(
+    pixels: np.ndarray,
+    palette: np.ndarray,
+    palette_r: np.ndarray,
+    palette_g: np.ndarray,
+    palette_b: np.ndarray,
+    bayer_offset: np.ndarray,
+    lut: np.ndarray
+) -> np.ndarray:
+    """ordered (bayer) dithering on the calling thread"""
+    height, width = pixels.shape[:2]
+    output = np.empty((height, width, 3), dtype=np.uint8)
+    
+    for y in range(height):
+        _dither_ordered_row(
+            pixels, palette, palette_r, palette_g, palette_b, bayer_offset, lut, output, y
+        )
+    
+    return output
+
+
+def _rgb_pixels(image: Image.Image) -> np.ndarray:
+    """image as an (h, w, 3) uint8 array"""
     if image.mode != 'RGB':
         image = image.convert('RGB')
     
-    pixels = np.array(image)
-    palette_array = np.array(palette, dtype=np.uint8) if palette else _TRANS_PALETTE_ARRAY
+    return np.array(image, dtype=np.uint8)
+
+
+@jit(nopython=True, cache=True, fastmath=True, boundscheck=False, error_model='numpy')
+def _dither_ordered_sampled_numba(
+    pixels: np.ndarray,
+    rows: np.ndarray,
+    cols: np.ndarray,
+    palette: np.ndarray,
+    palette_r: np.ndarray,
+    palette_g: np.ndarray,
+    palette_b: np.ndarray,
+    bayer_offset: np.ndarray,
+    lut: np.ndarray
+) -> np.ndarray:
+    """ordered dithering of only the pixels at rows x cols, keeping their bayer phase"""
+    output = np.empty((len(rows), len(cols), 3), dtype=np.uint8)
+    has_lut = len(lut) > 0
     
-    if HAS_NUMBA:
-        output = _apply_palette_numba(pixels, palette_array)
-    else:
-        height, width = pixels.shape[:2]
-        pixels_flat = pixels.reshape(-1, 3)
-        output_flat = find_nearest_color_bulk(pixels_flat, palette_array)
-        output = output_flat.reshape(height, width, 3).astype(np.uint8)
+    for i in range(len(rows)):
+        y = rows[i]
+        offset_row = bayer_offset[y & 3]
+        for j in range(len(cols)):
+            x = cols[j]
+            offset = np.int64(offset_row[x & 3])
+            r = np.int64(pixels[y, x, 0]) + offset
+            g = np.int64(pixels[y, x, 1]) + offset
+            b = np.int64(pixels[y, x, 2]) + offset
+            
+            if has_lut and 0 <= r <= 255 and 0 <= g <= 255 and 0 <= b <= 255:
+                idx = lut[(r << 16) | (g << 8) | b]
+            else:
+                idx = _find_nearest_color_idx_rgb((r, g, b), palette_r, palette_g, palette_b)
+            output[i, j, 0] = palette[idx, 0]
+            output[i, j, 1] = palette[idx, 1]
+            output[i, j, 2] = palette[idx, 2]
     
+    return output
+
+
+def apply_trans_palette(image: Image.Image, palette: list = None) -> Image.Image:
+    """reduce image to trans flag palette (7 colors)"""
+    palette_array = _palette_array(palette)
+    output = _apply_trans_palette_impl(_rgb_pixels(image), palette_array)
     return Image.fromarray(output, mode='RGB')
 
 
-def dither_floyd_steinberg(image: Image.Image, palette: list = None) -> Image.Image:
-    """floyd-steinberg dithering"""
-    if image.mode != 'RGB':
-        image = image.convert('RGB')
-    
-    pixels = np.array(image, dtype=np.uint8)
-    palette_array = np.array(palette, dtype=np.uint8) if palette else _TRANS_PALETTE_ARRAY
+def _apply_trans_palette_impl(pixels: np.ndarray, palette_array: np.ndarray) -> np.ndarray:
+    """reduce an rgb array to the palette"""
+    # the gpu kernel is weighted rgb, so it doesn't stand in for the LAB fallback
+    if _use_gpu(pixels) and (HAS_NUMBA or not HAS_SKIMAGE):
+        output = _try_palette_map_gpu(pixels, palette_array)
+        if output is not None:
+            return output
     
     if HAS_NUMBA:
-        output = _dither_floyd_steinberg_numba(pixels, palette_array)
-    else:
-        output = _dither_floyd_steinberg_fallback(image, palette_array)
+        apply_palette = _apply_palette_numba_serial if _use_serial(pixels) else _apply_palette_numba
+        return apply_palette(
+            pixels,
+            palette_array,
+            *_palette_channels(palette_array),
+            _get_palette_lut(palette_array)
+        )
     
+    height, width = pixels.shape[:2]
+    pixels_flat = pixels.reshape(-1, 3)
+    output_flat = find_nearest_color_bulk(pixels_flat, palette_array)
+    return output_flat.reshape(height, width, 3).astype(np.uint8)
+
+
+def dither_floyd_steinberg(image: Image.Image, palette: list = None) -> Image.Image:
+    """floyd-steinberg dithering"""
+    palette_array = _palette_array(palette)
+    output = _dither_floyd_steinberg_impl(_rgb_pixels(image), palette_array)
     return Image.fromarray(output, mode='RGB')
 
 
-def _dither_floyd_steinberg_fallback(image: Image.Image, palette: np.ndarray) -> np.ndarray:
+def _dither_floyd_steinberg_impl(pixels: np.ndarray, palette_array: np.ndarray) -> np.ndarray:
+    """floyd-steinberg dithering of an rgb array"""
+    if HAS_NUMBA:
+        return _dither_floyd_steinberg_numba(
+            pixels,
+            palette_array,
+            *_palette_channels(palette_array)
+        )
+    
+    return _dither_floyd_steinberg_fallback(pixels, palette_array)
+
+
+def _dither_floyd_steinberg_fallback(pixels: np.ndarray, palette: np.ndarray) -> np.ndarray:
     """floyd-steinberg without numba"""
-    pixels = np.array(image, dtype=np.float32)
+    pixels = pixels.astype(np.float32)
     height, width = pixels.shape[:2]
+    palette_r, palette_g, palette_b = _palette_channels(palette)
     
     for y in range(height):
         for x in range(width):
             old_pixel = pixels[y, x].copy()
-            idx = _find_nearest_color_idx_rgb(old_pixel, palette)
+            idx = _find_nearest_color_idx_rgb(old_pixel, palette_r, palette_g, palette_b)
             new_pixel = palette[idx].astype(np.float32)
             pixels[y, x] = new_pixel
             
@@ -215,29 +690,33 @@ def _dither_floyd_steinberg_fallback(image: Image.Image, palette: np.ndarray) ->
 
 def dither_atkinson(image: Image.Image, palette: list = None) -> Image.Image:
     """atkinson dithering"""
-    if image.mode != 'RGB':
-        image = image.convert('RGB')
-    
-    pixels = np.array(image, dtype=np.uint8)
-    palette_array = np.array(palette, dtype=np.uint8) if palette else _TRANS_PALETTE_ARRAY
-    
+    palette_array = _palette_array(palette)
+    output = _dither_atkinson_impl(_rgb_pixels(image), palette_array)
+    return Image.fromarray(output, mode='RGB')
+
+
+def _dither_atkinson_impl(pixels: np.ndarray, palette_array: np.ndarray) -> np.ndarray:
+    """atkinson dithering of an rgb array"""
     if HAS_NUMBA:
-        output = _dither_atkinson_numba(pixels, palette_array)
-    else:
-        output = _dither_atkinson_fallback(image, palette_array)
+        return _dither_atkinson_numba(
+            pixels,
+            palette_array,
+            *_palette_channels(palette_array)
+        )
     
-    return Image.fromarray(output, mode='RGB')
+    return _dither_atkinson_fallback(pixels, palette_array)
 
 
-def _dither_atkinson_fallback(image: Image.Image, palette: np.ndarray) -> np.ndarray:
+def _dither_atkinson_fallback(pixels: np.ndarray, palette: np.ndarray) -> np.ndarray:
     """atkinson without numba"""
-    pixels = np.array(image, dtype=np.float32)
+    pixels = pixels.astype(np.float32)
     height, width = pixels.shape[:2]
+    palette_r, palette_g, palette_b = _palette_channels(palette)
     
     for y in range(height):
         for x in range(width):
             old_pixel = pixels[y, x].copy()
-            idx = _find_nearest_color_idx_rgb(old_pixel, palette)
+            idx = _find_nearest_color_idx_rgb(old_pixel, palette_r, palette_g, palette_b)
             new_pixel = palette[idx].astype(np.float32)
             pixels[y, x] = new_pixel
             
@@ -261,34 +740,88 @@ def _dither_atkinson_fallback(image: Image.Image, palette: np.ndarray) -> np.nda
 
 def dither_ordered(image: Image.Image, palette: list = None) -> Image.Image:
     """ordered (bayer 4x4) dithering"""
-    if image.mode != 'RGB':
-        image = image.convert('RGB')
-    
-    pixels = np.array(image, dtype=np.uint8)
-    palette_array = np.array(palette, dtype=np.uint8) if palette else _TRANS_PALETTE_ARRAY
+    palette_array = _palette_array(palette)
+    output = _dither_ordered_impl(_rgb_pixels(image), palette_array)
+    return Image.fromarray(output, mode='RGB')
+
+
+def _dither_ordered_impl(pixels: np.ndarray, palette_array: np.ndarray) -> np.ndarray:
+    """ordered (bayer 4x4) dithering of an rgb array"""
+    if _use_gpu(pixels):
+        output = _try_palette_map_gpu(pixels, palette_array, _BAYER_OFFSET)
+        if output is not None:
+            return output
     
     if HAS_NUMBA:
-        output = _dither_ordered_numba(pixels, palette_array, BAYER_MATRIX)
-    else:
-        output = _dither_ordered_fallback(pixels, palette_array)
+        dither = _dither_ordered_numba_serial if _use_serial(pixels) else _dither_ordered_numba
+        return dither(
+            pixels,
+            palette_array,
+            *_palette_channels(palette_array),
+            _BAYER_OFFSET,
+            _get_palette_lut(palette_array)
+        )
     
-    return Image.fromarray(output, mode='RGB')
+    height, width = pixels.shape[:2]
+    return _dither_ordered_fallback(pixels, palette_array, np.arange(height), np.arange(width))
 
 
-def _dither_ordered_fallback(pixels: np.ndarray, palette: np.ndarray) -> np.ndarray:
-    """ordered dithering without numba"""
+def _dither_ordered_fallback(
+    pixels: np.ndarray,
+    palette: np.ndarray,
+    rows: np.ndarray,
+    cols: np.ndarray
+) -> np.ndarray:
+    """ordered dithering without numba, pixels sit at rows x cols of the full image"""
     height, width = pixels.shape[:2]
-    output = np.empty_like(pixels, dtype=np.uint8)
     
-    for y in range(height):
-        for x in range(width):
-            threshold = BAYER_MATRIX[y % 4, x % 4]
-            offset = (threshold - 0.5) * 64
-            adjusted = pixels[y, x].astype(np.float32) + offset
-            idx = _find_nearest_color_idx_rgb(adjusted, palette)
-            output[y, x] = palette[idx]
+    # bayer offsets tiled over the image; left unclamped like the numba kernel
+    offset = _BAYER_OFFSET[(rows & 3)[:, np.newaxis], cols & 3]
+    adjusted = pixels.astype(np.float32) + offset[..., np.newaxis]
     
-    return output
+    output_flat = find_nearest_color_rgb_bulk(adjusted.reshape(-1, 3), palette)
+    return output_flat.reshape(height, width, 3)
+
+
+def _dither_ordered_sampled(
+    pixels: np.ndarray,
+    palette_array: np.ndarray,
+    rows: np.ndarray,
+    cols: np.ndarray
+) -> np.ndarray:
+    """ordered dithering of just the pixels at rows x cols"""
+    if HAS_NUMBA:
+        return _dither_ordered_sampled_numba(
+            pixels,
+            rows,
+            cols,
+            palette_array,
+            *_palette_channels(palette_array),
+            _BAYER_OFFSET,
+            _get_palette_lut(palette_array)
+        )
+    
+    sampled = pixels[rows[:, np.newaxis], cols]
+    return _dither_ordered_fallback(sampled, palette_array, rows, cols)
+
+
+def _apply_trans_palette_sampled(
+    pixels: np.ndarray,
+    palette_array: np.ndarray,
+    rows: np.ndarray,
+    cols: np.ndarray
+) -> np.ndarray:
+    """reduce just the pixels at rows x cols to the palette"""
+    return _apply_trans_palette_impl(pixels[rows[:, np.newaxis], cols], palette_array)
+
+
+def _nearest_sample_indices(length: int, downsampled_length: int) -> np.ndarray:
+    """source index behind each pixel of a nearest-neighbor downscale"""
+    # pillow's nearest rounding isn't a plain stride, so run its resampler
+    # over a strip of indices instead of guessing it
+    indices = Image.fromarray(np.arange(length, dtype=np.int32).reshape(1, -1), mode='I')
+    downsampled = indices.resize((downsampled_length, 1), Image.NEAREST)
+    return np.asarray(downsampled).reshape(-1).astype(np.intp)
 
 
 def pixelate(image: Image.Image, block_size: int) -> Image.Image:
@@ -307,6 +840,20 @@ def pixelate(image: Image.Image, block_size: int) -> Image.Image:
     return downsampled_image.resize((width, height), Image.NEAREST)
 
 
+_QUANTIZERS = {
+    'floyd_steinberg': _dither_floyd_steinberg_impl,
+    'atkinson': _dither_atkinson_impl,
+    'ordered': _dither_ordered_impl,
+}
+
+# error diffusion carries error across every pixel, so it can't skip any
+_QUANTIZERS_NEEDING_NEIGHBORS = {'floyd_steinberg', 'atkinson'}
+
+_SAMPLED_QUANTIZERS = {
+    'ordered': _dither_ordered_sampled,
+}
+
+
 def apply_transforms(
     image: Image.Image,
     dithering: str = 'none',
@@ -314,21 +861,23 @@ def apply_transforms(
     invert: bool = False
 ) -> Image.Image:
     """apply all transformations (dither then pixelate)"""
-    palette = INVERTED_PALETTE if invert else None
-
-    if image.mode != 'RGB':
-        result = image.convert('RGB')
-    else:
-        result = image.copy()
-    
-    if dithering == 'floyd_steinberg':
-        result = dither_floyd_steinberg(result, palette)
-    elif dithering == 'atkinson':
-        result = dither_atkinson(result, palette)
-    elif dithering == 'ordered':
-        result = dither_ordered(result, palette)
-    else:
-        result = apply_trans_palette(result, palette)
+    palette_array = _INVERTED_PALETTE_ARRAY if invert else _TRANS_PALETTE_ARRAY
+    pixels = _rgb_pixels(image)
+    
+    # per-pixel methods commute with the nearest downscale, so only quantize
+    # the pixels pixelate would keep and upscale that
+    if pixelation > 1 and dithering not in _QUANTIZERS_NEEDING_NEIGHBORS:
+        height, width = pixels.shape[:2]
+        rows = _nearest_sample_indices(height, max(1, height // pixelation))
+        cols = _nearest_sample_indices(width, max(1, width // pixelation))
+        
+        quantize_sampled = _SAMPLED_QUANTIZERS.get(dithering, _apply_trans_palette_sampled)
+        downsampled = Image.fromarray(quantize_sampled(pixels, palette_array, rows, cols), mode='RGB')
+        return downsampled.resize((width, height), Image.NEAREST)
+    
+    # one array in, one image out - the steps work on the array directly
+    quantize = _QUANTIZERS.get(dithering, _apply_trans_palette_impl)
+    result = Image.fromarray(quantize(pixels, palette_array), mode='RGB')
 
     if pixelation > 1:
         result = pixelate(result, pixelation)
@@ -343,6 +892,7 @@ def get_palette_info() -> dict:
         'colors': TRANS_PALETTE,
         'has_skimage': HAS_SKIMAGE,
         'has_numba': HAS_NUMBA,
+        'has_cupy': HAS_CUPY,
         'color_matching': 'LAB (perceptually uniform)' if HAS_SKIMAGE else 'Weighted RGB',
         'optimization': 'Numba JIT' if HAS_NUMBA else 'NumPy'
     }
@@ -47,6 +47,43 @@ TRANS_WHITE_HEX = "#ffffff"
 # cache for LAB palette
 _LAB_PALETTE_CACHE: Optional[np.ndarray] = None
 
+# sRGB (D65) -> XYZ matrix and D65 2-degree white point, as used by skimage
+_XYZ_FROM_RGB = np.array([
+    [0.412453, 0.357580, 0.180423],
+    [0.212671, 0.715160, 0.072169],
+    [0.019334, 0.119193, 0.950227]
+]).T.astype(np.float32)
+_LAB_WHITE_POINT = np.array([0.95047, 1.0, 1.08883], dtype=np.float32)
+
+
+def _build_srgb_to_linear() -> np.ndarray:
+    """gamma-expanded value for each 8-bit srgb level"""
+    levels = np.arange(256, dtype=np.float32) / 255.0
+    return np.where(
+        levels > 0.04045,
+        np.power((levels + 0.055) / 1.055, 2.4),
+        levels / 12.92
+    ).astype(np.float32)
+
+
+_SRGB_TO_LINEAR = _build_srgb_to_linear()
+
+
+def _rgb_to_lab(pixels: np.ndarray) -> np.ndarray:
+    """convert (N, 3) uint8 rgb to LAB, same numbers as skimage's rgb2lab"""
+    # (N, 1, 3) @ (3, 3) rounds like skimage does, a plain (N, 3) matmul goes
+    # through blas and can land an ulp away
+    linear = _SRGB_TO_LINEAR[pixels].reshape(-1, 1, 3)
+    xyz = (linear @ _XYZ_FROM_RGB).reshape(-1, 3)
+    xyz /= _LAB_WHITE_POINT
+    
+    small = xyz <= 0.008856
+    xyz[~small] = np.cbrt(xyz[~small])
+    xyz[small] = 7.787 * xyz[small] + 16.0 / 116.0
+    
+    x, y, z = xyz[:, 0], xyz[:, 1], xyz[:, 2]
+    return np.stack([116.0 * y - 16.0, 500.0 * (x - y), 200.0 * (y - z)], axis=1)
+
 
 def _get_lab_palette() -> np.ndarray:
     """get palette in LAB color space (in cache)"""
@@ -65,35 +102,39 @@ def _get_lab_palette() -> np.ndarray:
     return _LAB_PALETTE_CACHE
 
 
-def estimate_png_size(image: Image.Image) -> int:
-    """estimate png file size"""
-    buffer = BytesIO()
-    image.save(buffer, format='PNG', optimize=True)
+def _encoded_size(image: Image.Image, buffer: Optional[BytesIO], **save_options) -> int:
+    """encode into buffer and return the byte count"""
+    if buffer is None:
+        buffer = BytesIO()
+    else:
+        # overwrite from the start instead of truncating so the buffer keeps its
+        # allocation between estimates, only the bytes written this time count
+        buffer.seek(0)
+    image.save(buffer, **save_options)
     return buffer.tell()
 
 
-def estimate_webp_size(image: Image.Image) -> int:
+def estimate_png_size(image: Image.Image, buffer: Optional[BytesIO] = None) -> int:
+    """estimate png file size"""
+    return _encoded_size(image, buffer, format='PNG', optimize=True)
+
+
+def estimate_webp_size(image: Image.Image, buffer: Optional[BytesIO] = None) -> int:
     """estimate lossless webp file size"""
-    buffer = BytesIO()
-    image.save(buffer, format='WEBP', lossless=True)
-    return buffer.tell()
+    return _encoded_size(image, buffer, format='WEBP', lossless=True)
 
 
-def estimate_jxl_size(image: Image.Image) -> int:
+def estimate_jxl_size(image: Image.Image, buffer: Optional[BytesIO] = None) -> int:
     """estimate lossless jxl file size, returns 0 if jxl not available"""
     try:
-        buffer = BytesIO()
-        image.save(buffer, format='JXL', lossless=True)
-        return buffer.tell()
+        return _encoded_size(image, buffer, format='JXL', lossless=True)
     except Exception:
         return 0
 
 
-def estimate_bmp_size(image: Image.Image) -> int:
+def estimate_bmp_size(image: Image.Image, buffer: Optional[BytesIO] = None) -> int:
     """estimate bmp file size"""
-    buffer = BytesIO()
-    image.save(buffer, format='BMP')
-    return buffer.tell()
+    return _encoded_size(image, buffer, format='BMP')
 
 
 def get_file_size(file_path: str) -> int:
@@ -132,7 +173,8 @@ def resize_for_preview(
     new_width = int(width * scale)
     new_height = int(height * scale)
     
-    return image.resize((new_width, new_height), Image.LANCZOS)
+    # reducing_gap does a cheap integer box reduce first, same as Image.thumbnail
+    return image.resize((new_width, new_height), Image.LANCZOS, reducing_gap=2.0)
 
 
 def find_nearest_color_bulk(
@@ -143,25 +185,49 @@ def find_nearest_color_bulk(
     palette_lab = _get_lab_palette()
     
     if HAS_SKIMAGE and palette_lab is not None:
-        pixels_normalized = pixels.astype(np.float32) / 255.0
-        pixels_lab = skimage_color.rgb2lab(pixels_normalized.reshape(-1, 1, 3)).reshape(-1, 3)
+        # photos repeat colors a lot, so only convert each distinct color once
+        pixels_int = pixels.astype(np.uint32)
+        packed = (pixels_int[:, 0] << 16) | (pixels_int[:, 1] << 8) | pixels_int[:, 2]
+        unique_packed, inverse = np.unique(packed, return_inverse=True)
+        unique_rgb = np.stack(
+            [(unique_packed >> 16) & 0xFF, (unique_packed >> 8) & 0xFF, unique_packed & 0xFF],
+            axis=1
+        )
+        
+        unique_lab = _rgb_to_lab(unique_rgb)
         
         distances = np.linalg.norm(
-            pixels_lab[:, np.newaxis, :] - palette_lab[np.newaxis, :, :],
+            unique_lab[:, np.newaxis, :] - palette_lab[np.newaxis, :, :],
             axis=2
         )
         
         nearest_indices = np.argmin(distances, axis=1)
         
-        return palette_rgb[nearest_indices]
+        return palette_rgb[nearest_indices[inverse.reshape(-1)]]
     else:
-        weights = np.array([2, 4, 3], dtype=np.float32)
-        
-        diff = pixels[:, np.newaxis, :].astype(np.float32) - palette_rgb[np.newaxis, :, :].astype(np.float32)
-        distances = np.sum(weights * (diff ** 2), axis=2)
-        
-        nearest_indices = np.argmin(distances, axis=1)
-        return palette_rgb[nearest_indices]
+        return find_nearest_color_rgb_bulk(pixels, palette_rgb)
+
+
+def find_nearest_color_rgb_bulk(
+    pixels: np.ndarray,
+    palette_rgb: np.ndarray
+) -> np.ndarray:
+    """find nearest colors for all pixels using weighted rgb distance"""
+    # running argmin one palette entry at a time, so peak memory is a couple
+    # of (N,) buffers instead of an (N, palette, 3) broadcast
+    red, green, blue = pixels.astype(np.float32).T
+    palette_float = palette_rgb.astype(np.float32)
+    
+    best_distances = np.full(len(pixels), np.inf, dtype=np.float32)
+    nearest_indices = np.zeros(len(pixels), dtype=np.intp)
+    
+    for i, (pr, pg, pb) in enumerate(palette_float):
+        distances = 2 * (red - pr) ** 2 + 4 * (green - pg) ** 2 + 3 * (blue - pb) ** 2
+        closer = distances < best_distances
+        best_distances[closer] = distances[closer]
+        nearest_indices[closer] = i
+    
+    return palette_rgb[nearest_indices]
 
 
 SUPPORTED_IMAGE_FORMATS = [